@@ -1,8 +1,40 @@
-from playwright.sync_api import sync_playwright
-import time
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+import asyncio
 import json
+import os
+import random
+import shutil
+from urllib.parse import quote_plus
 from typing import List, Dict
 
+try:
+    import orjson  # optional: faster JSON output
+except ImportError:
+    orjson = None
+
+
+# Resource types DuckDuckGo doesn't need to render the result links
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet"}
+BROWSER_ARGS = ["--disable-dev-shm-usage", "--no-sandbox", "--disable-gpu"]
+
+# Ad/tracker requests blocked inside the browser (no Python round-trip per request)
+TRACKER_URL_PATTERNS = [
+    "*.doubleclick.net/*", "*.google-analytics.com/*",
+    "*.googletagmanager.com/*", "*duckduckgo.com/t/*",
+]
+
+# Persistent browser profile, so cookies and DDG's cached assets survive between runs
+PROFILE_DIR = os.path.expanduser("~/.cache/contract-finder/pw")
+PROFILE_CACHE_LIMIT = 200 * 1024 * 1024
+
+# True once at least `n` result links are on the page
+RESULTS_LOADED_JS = "(n) => document.querySelectorAll(\"a[data-testid='result-title-a']\").length >= n"
+
+# Collect the first `n` result titles and URLs in a single round-trip
+EXTRACT_RESULTS_JS = """(n) => Array.from(document.querySelectorAll("a[data-testid='result-title-a']"))
+    .slice(0, n)
+    .map(a => ({title: a.innerText, url: a.href}))"""
+
 
 def generate_search_queries(company: str, product: str, context: str) -> List[str]:
     """Generate multiple targeted search queries based on company, product, and context."""
@@ -36,52 +68,125 @@ def extract_keywords(text: str) -> List[str]:
     return keywords
 
 
-def duckduckgo_search(query: str, max_results: int = 20) -> List[Dict[str, str]]:
-    """Perform a DuckDuckGo search and return results."""
-    results = []
+async def block_heavy_resources(route):
+    """Abort requests for images, media, fonts, and stylesheets."""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
-        page = browser.new_page()
 
-        try:
-            page.goto("https://duckduckgo.com/", timeout=60000)
-            page.wait_for_selector("input[name='q']", timeout=10000)
+async def block_trackers(context, page):
+    """Block tracker URLs for a page through a CDP session."""
+    cdp = await context.new_cdp_session(page)
+    await cdp.send("Network.enable")
+    await cdp.send("Network.setBlockedURLs", {"urls": TRACKER_URL_PATTERNS})
 
-            # Mimic human typing
-            page.type("input[name='q']", query, delay=80)
-            page.keyboard.press("Enter")
 
-            page.wait_for_selector("a[data-testid='result-title-a']", timeout=60000)
+async def ddg_search_async(context, query: str, max_results: int = 20) -> List[Dict[str, str]]:
+    """Perform a DuckDuckGo search in the given browser context and return results."""
+    results = []
+    page = await context.new_page()
+    await block_trackers(context, page)
 
-            # Scroll to load more results
-            for _ in range(3):
-                page.mouse.wheel(0, 3000)
-                time.sleep(1.5)
+    try:
+        # Go straight to the results page instead of typing into the homepage
+        await page.goto(f"https://duckduckgo.com/?q={quote_plus(query)}", timeout=30000)
+        await page.wait_for_selector("a[data-testid='result-title-a']", timeout=60000)
 
-            links = page.query_selector_all("a[data-testid='result-title-a']")
+        # Scroll until enough results have loaded
+        for _ in range(6):
+            await page.mouse.wheel(0, 5000)
+            try:
+                await page.wait_for_function(RESULTS_LOADED_JS, arg=max_results, timeout=1500)
+                break
+            except PlaywrightTimeoutError:
+                continue
 
-            for link in links[:max_results]:
-                title = link.inner_text()
-                url = link.get_attribute("href")
-                if title and url:
-                    results.append({
-                        "title": title,
-                        "url": url
-                    })
+        for item in await page.evaluate(EXTRACT_RESULTS_JS, max_results):
+            title = item["title"]
+            url = item["url"]
+            if title and url:
+                results.append({
+                    "title": title,
+                    "url": url
+                })
 
-        except Exception as e:
-            print(f"Error during search: {e}")
-        finally:
-            browser.close()
+    except Exception as e:
+        print(f"Error during search '{query}': {e}")
+    finally:
+        await page.close()
 
     return results
 
 
+def trim_profile_cache(profile_dir: str = PROFILE_DIR, limit: int = PROFILE_CACHE_LIMIT):
+    """Drop the profile's HTTP cache once it grows past `limit` bytes."""
+    cache_dir = os.path.join(profile_dir, "Default", "Cache")
+    size = sum(os.path.getsize(os.path.join(root, name))
+               for root, _, files in os.walk(cache_dir) for name in files)
+    if size > limit:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+class BrowserPool:
+    """One Playwright instance and persistent browser context shared by every search; each query gets a tab."""
+
+    def __init__(self, max_parallel: int = 3):
+        self.max_parallel = max_parallel
+        self.playwright = None
+        self.context = None
+        self._sem = None
+
+    async def __aenter__(self):
+        trim_profile_cache()
+        self.playwright = await async_playwright().start()
+        self.context = await self.playwright.chromium.launch_persistent_context(
+            user_data_dir=PROFILE_DIR, headless=True, args=BROWSER_ARGS, service_workers="block")
+        # One route for the whole session instead of one per page
+        await self.context.route("**/*", block_heavy_resources)
+        self._sem = asyncio.Semaphore(self.max_parallel)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.context.close()
+        await self.playwright.stop()
+
+    async def search(self, query: str, max_results: int = 20) -> List[Dict[str, str]]:
+        """Run one search in a new tab of the shared context."""
+        async with self._sem:
+            # Short random pause instead of a fixed wait, to avoid rate limiting
+            await asyncio.sleep(random.uniform(0.3, 1.0))
+            return await ddg_search_async(self.context, query, max_results)
+
+
+async def run_searches_async(queries: List[str], max_results: int = 20,
+                             max_parallel: int = 3) -> Dict[str, List[Dict[str, str]]]:
+    """Run several searches concurrently through one BrowserPool."""
+    async with BrowserPool(max_parallel) as pool:
+        results = await asyncio.gather(*[pool.search(q, max_results) for q in queries])
+
+    return dict(zip(queries, results))
+
+
+def run_searches(queries: List[str], max_results: int = 20) -> Dict[str, List[Dict[str, str]]]:
+    """Synchronous wrapper around run_searches_async."""
+    return asyncio.run(run_searches_async(queries, max_results))
+
+
+def duckduckgo_search(query: str, max_results: int = 20) -> List[Dict[str, str]]:
+    """Perform a DuckDuckGo search and return results."""
+    return run_searches([query], max_results)[query]
+
+
 def save_results(results: Dict[str, List[Dict]], filename: str = "search_results.json"):
     """Save search results to a JSON file."""
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        with open(filename, 'wb') as f:
+            f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
     print(f"\n✓ Results saved to {filename}")
 
 
@@ -123,16 +228,14 @@ def main():
         print("Invalid input, using default: 3")
     
     # Execute searches
-    all_results = {}
+    print(f"\nRunning {num_queries} searches in parallel...")
+    all_results = run_searches(queries[:num_queries], max_results)
     
-    for i, query in enumerate(queries[:num_queries], 1):
+    for i, (query, results) in enumerate(all_results.items(), 1):
         print(f"\n{'=' * 60}")
         print(f"Search {i}/{num_queries}: {query}")
         print('=' * 60)
         
-        results = duckduckgo_search(query, max_results)
-        all_results[query] = results
-        
         if results:
             print(f"\nFound {len(results)} results:")
             for j, r in enumerate(results, 1):
@@ -140,11 +243,6 @@ def main():
                 print(f"   {r['url']}")
         else:
             print("No results found.")
-        
-        # Wait between searches to avoid rate limiting
-        if i < num_queries:
-            print("\nWaiting 3 seconds before next search...")
-            time.sleep(3)
     
     # Summary
     print(f"\n{'=' * 60}")